@@ -0,0 +1,310 @@
+"""
+Benchmarks for the hot paths in exercises_solutions.
+
+Run and save a baseline:
+    python benchmarks/run_benchmarks.py run --output benchmarks/baselines/main.json
+
+Compare two runs (exits with status 1 if anything regressed):
+    python benchmarks/run_benchmarks.py compare baseline.json current.json
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import platform
+import random
+import statistics
+import sys
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from time import perf_counter
+from types import ModuleType
+from typing import Callable
+
+SOLUTIONS = Path(__file__).resolve().parent.parent / "exercises_solutions"
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+SEED = 1234
+
+
+def load_solution(filename: str) -> ModuleType:
+    """Import a solution file by path. Its usage output is discarded."""
+    name = "bench_" + filename.removesuffix(".py")
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, SOLUTIONS / filename)
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    with contextlib.redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(module)
+    return module
+
+
+@dataclass
+class Result:
+    throughput: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    peak_kib: float
+
+
+# A case builds its inputs for a size and returns the function to time.
+Case = Callable[[int], Callable[[], object]]
+
+
+def energy_readings(energy: ModuleType, size: int) -> list[object]:
+    rng = random.Random(SEED)
+    start = datetime(2024, 1, 1)
+    return [
+        energy.MeterReading(
+            f"MTR-{i % 1000:04d}",
+            rng.choice(("electricity", "gas")),
+            rng.uniform(0.0, 5.0),
+            start + timedelta(minutes=30 * i),
+            f"CUST-{i % 1000:04d}",
+        )
+        for i in range(size)
+    ]
+
+
+def energy_accounts(energy: ModuleType, size: int) -> list[object]:
+    readings = energy_readings(energy, size)
+    tariff = energy.create_tariff("TAR-001", "fixed", 0.15, 25.0)
+    accounts = []
+    for i in range(max(size // 10, 1)):
+        customer = {
+            "customer_id": f"CUST-{i:06d}",
+            "name": "Bench",
+            "email": f"bench{i}@example.com",
+            "status": "active",
+        }
+        accounts.append(
+            energy.Account(customer, tariff, readings[i * 10 : i * 10 + 10], 0.0)
+        )
+    return accounts
+
+
+def bulk_generate_bills(size: int) -> Callable[[], object]:
+    energy = load_solution("10_energy_platform.py")
+    accounts = energy_accounts(energy, size * 10)
+    period = energy.generate_billing_period("2024-01-01", "2024-01-31", 300.0)
+    return lambda: energy.bulk_generate_bills(accounts, period, lambda bill: True)
+
+
+def get_high_usage_customers(size: int) -> Callable[[], object]:
+    energy = load_solution("10_energy_platform.py")
+    accounts = energy_accounts(energy, size)
+    return lambda: energy.get_high_usage_customers(
+        accounts, 2.5, energy.calculate_average_consumption
+    )
+
+
+def process_readings_batch(size: int) -> Callable[[], object]:
+    energy = load_solution("10_energy_platform.py")
+    readings = energy_readings(energy, size)
+    return lambda: sum(1 for _ in energy.process_readings_batch(readings, 100))
+
+
+def aggregate_readings_by_type(size: int) -> Callable[[], object]:
+    energy = load_solution("10_energy_platform.py")
+    readings = energy_readings(energy, size)
+    return lambda: energy.aggregate_readings_by_type(readings)
+
+
+def meter_readings(size: int) -> list[object]:
+    meters = load_solution("8_meter_readings.py")
+    rng = random.Random(SEED)
+    return [
+        meters.MeterReading(
+            f"ELEC{i % 1000:04d}", rng.uniform(0.0, 100.0), "2024-01-01"
+        )
+        for i in range(size)
+    ]
+
+
+def process_readings_in_batches(size: int) -> Callable[[], object]:
+    meters = load_solution("8_meter_readings.py")
+    readings = meter_readings(size)
+    return lambda: sum(1 for _ in meters.process_readings_in_batches(readings, 100))
+
+
+def average_consumption(size: int) -> Callable[[], object]:
+    meters = load_solution("8_meter_readings.py")
+    readings = meter_readings(size)
+    return lambda: meters.average_consumption(readings)
+
+
+def apply_spam_filter(size: int) -> Callable[[], object]:
+    processor = load_solution("9_data_processor.py")
+    rng = random.Random(SEED)
+    contents = [
+        "Hello world",
+        "BUY NOW!!!",
+        "Meeting at 3pm",
+        "click here for FREE MONEY",
+    ]
+    messages = [
+        processor.Message(f"user{i}@example.com", rng.choice(contents), "email")
+        for i in range(size)
+    ]
+    return lambda: processor.apply_spam_filter(messages, processor.is_spam_message)
+
+
+def sample_text(size: int) -> str:
+    rng = random.Random(SEED)
+    vocabulary = [f"word{i}" for i in range(5_000)]
+    return " ".join(rng.choice(vocabulary) for _ in range(size))
+
+
+def count_words(size: int) -> Callable[[], object]:
+    collections = load_solution("3_collections.py")
+    text = sample_text(size)
+    return lambda: collections.count_words(text)
+
+
+def get_top_words(size: int) -> Callable[[], object]:
+    collections = load_solution("3_collections.py")
+    text = sample_text(size)
+    return lambda: collections.get_top_words(text, 10)
+
+
+CASES: dict[str, Case] = {
+    "energy.bulk_generate_bills": bulk_generate_bills,
+    "energy.get_high_usage_customers": get_high_usage_customers,
+    "energy.process_readings_batch": process_readings_batch,
+    "energy.aggregate_readings_by_type": aggregate_readings_by_type,
+    "meters.process_readings_in_batches": process_readings_in_batches,
+    "meters.average_consumption": average_consumption,
+    "data_processor.apply_spam_filter": apply_spam_filter,
+    "collections.count_words": count_words,
+    "collections.get_top_words": get_top_words,
+}
+
+
+def measure(run: Callable[[], object], size: int, repeat: int) -> Result:
+    """
+    Time `repeat` calls, then one more call under tracemalloc for peak memory.
+    Needs repeat >= 2 for quantiles; p95 and p99 only mean much with many more.
+    """
+    if repeat < 2:
+        raise ValueError("repeat must be at least 2")
+    run()
+    latencies = []
+    for _ in range(repeat):
+        start = perf_counter()
+        run()
+        latencies.append(perf_counter() - start)
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return Result(
+        throughput=size / statistics.median(latencies),
+        p50_ms=cuts[49] * 1e3,
+        p95_ms=cuts[94] * 1e3,
+        p99_ms=cuts[98] * 1e3,
+        peak_kib=peak / 1024,
+    )
+
+
+def run_benchmarks(
+    sizes: list[int], repeat: int, only: str | None
+) -> dict[str, object]:
+    results: dict[str, dict[str, float]] = {}
+    for name, case in CASES.items():
+        if only and only not in name:
+            continue
+        for size in sizes:
+            result = measure(case(size), size, repeat)
+            results[f"{name}@{size}"] = asdict(result)
+            print(
+                f"{name:40} {size:>8}  {result.throughput:>14,.0f}/s  "
+                f"p50 {result.p50_ms:8.3f}ms  p99 {result.p99_ms:8.3f}ms  "
+                f"peak {result.peak_kib:10,.0f}KiB"
+            )
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+# Metric name -> True if a higher value is better. Tail latencies are reported
+# but not gated: from the default 20 samples they are too noisy.
+METRICS = {"throughput": True, "p50_ms": False, "peak_kib": False}
+
+
+def compare(
+    baseline: dict[str, dict[str, float]],
+    current: dict[str, dict[str, float]],
+    threshold: float,
+) -> list[str]:
+    """Return a message per metric that got worse by more than threshold."""
+    regressions = []
+    for key in sorted(baseline.keys() & current.keys()):
+        for metric, higher_is_better in METRICS.items():
+            before = baseline[key][metric]
+            after = current[key][metric]
+            if before <= 0:
+                continue
+            change = (after - before) / before
+            worse = -change if higher_is_better else change
+            if worse > threshold:
+                regressions.append(
+                    f"{key} {metric}: {before:,.3f} -> {after:,.3f} ({change:+.1%})"
+                )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run benchmarks")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    run_parser.add_argument("--repeat", type=int, default=20)
+    run_parser.add_argument("--only", help="run cases whose name contains this")
+    run_parser.add_argument("--output", type=Path, help="write results as JSON")
+    compare_parser = commands.add_parser("compare", help="diff two result files")
+    compare_parser.add_argument("baseline", type=Path)
+    compare_parser.add_argument("current", type=Path)
+    compare_parser.add_argument("--threshold", type=float, default=0.15)
+    args = parser.parse_args()
+    if args.command == "run" and args.repeat < 2:
+        parser.error("--repeat must be at least 2")
+
+    if args.command == "run":
+        report = run_benchmarks(args.sizes, args.repeat, args.only)
+        if args.output:
+            args.output.parent.mkdir(parents=True, exist_ok=True)
+            args.output.write_text(json.dumps(report, indent=2) + "\n")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())["results"]
+    current = json.loads(args.current.read_text())["results"]
+    regressions = compare(baseline, current, args.threshold)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    missing = sorted(baseline.keys() - current.keys())
+    for key in missing:
+        print(f"missing from current run: {key}")
+    if not regressions:
+        compared = len(baseline.keys() & current.keys())
+        print(f"No regressions over {args.threshold:.0%} in {compared} results")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
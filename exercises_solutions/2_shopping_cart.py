@@ -1,3 +1,6 @@
+from dataclasses import dataclass
+
+
 def add_item_to_cart(
     cart: list[dict[str, str | float]], item: str, price: float
 ) -> list[dict[str, str | float]]:
@@ -31,6 +34,68 @@ def get_cart_summary(cart: list[dict[str, str | float]]) -> str:
     return f"{item_count} items, total: ${total}"
 
 
+@dataclass
+class CartLine:
+    item: str
+    price: float
+    quantity: int
+
+
+class Cart:
+    """Shopping cart keyed by item name with a running total and count."""
+
+    def __init__(self) -> None:
+        self._lines: dict[str, CartLine] = {}
+        self._total = 0.0
+        self._count = 0
+
+    def add(self, item: str, price: float, quantity: int = 1) -> CartLine:
+        """Add an item. Adding an existing item increases its quantity."""
+        if quantity <= 0:
+            raise ValueError("Quantity must be positive")
+        line = self._lines.get(item)
+        if line is None:
+            line = CartLine(item, price, 0)
+            self._lines[item] = line
+        elif line.price != price:
+            raise ValueError(f"{item} is already in the cart at ${line.price}")
+        line.quantity += quantity
+        self._total += price * quantity
+        self._count += quantity
+        return line
+
+    def remove(self, item: str, quantity: int | None = None) -> None:
+        """Remove some or (by default) all of an item from the cart."""
+        if quantity is not None and quantity <= 0:
+            raise ValueError("Quantity must be positive")
+        line = self._lines[item]
+        if quantity is None or quantity >= line.quantity:
+            quantity = line.quantity
+            del self._lines[item]
+        else:
+            line.quantity -= quantity
+        self._total -= line.price * quantity
+        self._count -= quantity
+        if not self._lines:
+            self._total = 0.0
+
+    def find(self, item: str) -> CartLine | None:
+        """Find an item in the cart by name. Returns None if not found."""
+        return self._lines.get(item)
+
+    @property
+    def total(self) -> float:
+        return self._total
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def summary(self) -> str:
+        """Get a summary of the cart."""
+        return f"{self._count} items, total: ${self._total}"
+
+
 # Usage
 shopping_cart: list[dict[str, str | float]] = []
 add_item_to_cart(shopping_cart, "Apple", 1.50)
@@ -38,3 +103,10 @@ add_item_to_cart(shopping_cart, "Banana", 0.75)
 
 found = find_item(shopping_cart, "Apple")
 print(get_cart_summary(shopping_cart))
+
+cart = Cart()
+cart.add("Apple", 1.50)
+cart.add("Apple", 1.50, 2)
+cart.add("Banana", 0.75)
+found_line = cart.find("Apple")
+print(cart.summary())
@@ -1,3 +1,12 @@
+import heapq
+import os
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import Iterable, Iterator, Mapping
+
+
 def get_user_coordinates(user_id: int) -> tuple[float, float]:
     """Return user's latitude and longitude as a tuple."""
     return (51.5074, -0.1278)
@@ -10,11 +19,144 @@ def get_user_tags(user_id: int) -> set[str]:
 
 def count_words(text: str) -> dict[str, int]:
     """Count word frequencies in text."""
-    words = text.lower().split()
-    counts: dict[str, int] = {}
-    for word in words:
-        counts[word] = counts.get(word, 0) + 1
-    return counts
+    return count_words_stream([text])
+
+
+def read_chunks(path: str, chunk_size: int = 1 << 20) -> Iterator[str]:
+    """Read a text file in chunks of chunk_size characters."""
+    with open(path, encoding="utf-8") as file:
+        while chunk := file.read(chunk_size):
+            yield chunk
+
+
+def iter_words(chunks: Iterable[str]) -> Iterator[list[str]]:
+    """
+    Split chunks of text into lowercase words.
+    Yields one list of words per chunk; words cut at a chunk boundary are joined.
+    Words are lowercased whole, after splitting, so context-sensitive case
+    mappings such as the Greek final sigma match lowercasing the whole text.
+    """
+    carry = ""
+    for chunk in chunks:
+        text = carry + chunk
+        words = text.split()
+        carry = ""
+        if words and not text[-1].isspace():
+            carry = words.pop()
+        yield [word.lower() for word in words]
+    if carry:
+        yield [carry.lower()]
+
+
+def count_words_stream(chunks: Iterable[str]) -> dict[str, int]:
+    """Count word frequencies in text arriving as chunks."""
+    counts: Counter[str] = Counter()
+    for words in iter_words(chunks):
+        counts.update(words)
+    return dict(counts)
+
+
+class SpaceSaving:
+    """
+    Approximate word counter that keeps at most `capacity` words.
+    Counts are overestimated by at most the value in `errors`.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        if capacity <= 0:
+            raise ValueError("Capacity must be positive")
+        self.capacity = capacity
+        self.counts: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+        # Min-heap of (count, word). Entries may lag behind counts.
+        self._heap: list[tuple[int, str]] = []
+
+    def add(self, word: str) -> None:
+        counts = self.counts
+        if word in counts:
+            counts[word] += 1
+        elif len(counts) < self.capacity:
+            counts[word] = 1
+            self.errors[word] = 0
+            heapq.heappush(self._heap, (1, word))
+        else:
+            heap = self._heap
+            while heap[0][0] != counts[heap[0][1]]:
+                heapq.heapreplace(heap, (counts[heap[0][1]], heap[0][1]))
+            min_count, evicted = heap[0]
+            del counts[evicted], self.errors[evicted]
+            counts[word] = min_count + 1
+            self.errors[word] = min_count
+            heapq.heapreplace(heap, (min_count + 1, word))
+
+    def update(self, words: Iterable[str]) -> None:
+        for word in words:
+            self.add(word)
+
+    def top(self, n: int) -> list[tuple[str, int]]:
+        return top_words(self.counts, n)
+
+
+def count_words_approximate(chunks: Iterable[str], capacity: int) -> SpaceSaving:
+    """Count word frequencies in bounded memory."""
+    counter = SpaceSaving(capacity)
+    for words in iter_words(chunks):
+        counter.update(words)
+    return counter
+
+
+def top_words(counts: Mapping[str, int], n: int) -> list[tuple[str, int]]:
+    """Return the n highest counts in O(V log n), ties in insertion order."""
+    return heapq.nlargest(n, counts.items(), key=lambda x: x[1])
+
+
+def split_file(path: str, shards: int) -> list[tuple[int, int]]:
+    """Split a file into up to `shards` byte ranges that end on whitespace."""
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as file:
+        for i in range(1, shards):
+            position = max(size * i // shards, bounds[-1])
+            file.seek(position)
+            while (byte := file.read(1)) and not byte.isspace():
+                position += 1
+            if position >= size:
+                break
+            bounds.append(position)
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+
+def count_shard(path: str, start: int, end: int) -> dict[str, int]:
+    """Count words in bytes start:end of a UTF-8 file."""
+    with open(path, "rb") as file:
+        file.seek(start)
+        text = file.read(end - start).decode("utf-8")
+    return count_words_stream([text])
+
+
+def count_words_parallel(
+    path: str, workers: int | None = None, shards: int | None = None
+) -> dict[str, int]:
+    """
+    Count words in a file with a process pool.
+    Shard counts are merged in the parent in file order as they arrive, so
+    results match the serial count without sending counts back to workers.
+    """
+    workers = workers or os.cpu_count() or 1
+    ranges = split_file(path, shards or workers * 4)
+    if not ranges:
+        return {}
+    merged: Counter[str] = Counter()
+    with ProcessPoolExecutor(workers) as pool:
+        for counts in pool.map(
+            count_shard,
+            [path] * len(ranges),
+            [start for start, _ in ranges],
+            [end for _, end in ranges],
+        ):
+            merged.update(counts)
+    return dict(merged)
 
 
 def get_rgb_color(color_name: str) -> tuple[int, int, int]:
@@ -51,9 +193,62 @@ def parse_coordinates(coord_string: str) -> tuple[float, ...]:
 def get_top_words(text: str, n: int = 3) -> list[tuple[str, int]]:
     """Return top N most common words with their counts."""
     # Missing type parameters - list of tuples
-    word_counts = count_words(text)
-    sorted_words = sorted(word_counts.items(), key=lambda x: x[1], reverse=True)
-    return sorted_words[:n]
+    return top_words(count_words(text), n)
+
+
+def _write_sample_text(size_mb: int) -> str:
+    """Write roughly size_mb of text to a temporary file and return its path."""
+    vocabulary = [f"word{i}" for i in range(50_000)]
+    line = " ".join(vocabulary[(i * i) % len(vocabulary)] for i in range(2_000))
+    line += "\n"
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as file:
+        for _ in range(size_mb * (1 << 20) // len(line)):
+            file.write(line)
+    return file.name
+
+
+def benchmark_word_count(size_mb: int) -> None:
+    """Time streaming exact and approximate counting on a generated file."""
+    path = _write_sample_text(size_mb)
+    try:
+        start = perf_counter()
+        exact = count_words_stream(read_chunks(path))
+        exact_top = top_words(exact, 10)
+        exact_time = perf_counter() - start
+
+        start = perf_counter()
+        approximate = count_words_approximate(read_chunks(path), 1_000)
+        approximate_time = perf_counter() - start
+
+        print(f"{size_mb} MB, {len(exact)} distinct words")
+        print(f"exact: {exact_time:.2f}s, top: {exact_top[:3]}")
+        print(f"approximate: {approximate_time:.2f}s, top: {approximate.top(3)}")
+    finally:
+        os.remove(path)
+
+
+def benchmark_parallel_word_count(size_mb: int) -> None:
+    """Report parallel counting speedup from 1 to cpu_count workers."""
+    path = _write_sample_text(size_mb)
+    try:
+        start = perf_counter()
+        serial = count_words_stream(read_chunks(path))
+        serial_time = perf_counter() - start
+        print(f"{size_mb} MB serial: {serial_time:.2f}s")
+
+        workers = 1
+        max_workers = os.cpu_count() or 1
+        while True:
+            start = perf_counter()
+            parallel = count_words_parallel(path, workers)
+            elapsed = perf_counter() - start
+            assert parallel == serial
+            print(f"{workers} workers: {elapsed:.2f}s, {serial_time / elapsed:.2f}x")
+            if workers >= max_workers:
+                break
+            workers = min(workers * 2, max_workers)
+    finally:
+        os.remove(path)
 
 
 # Usage
@@ -65,3 +260,8 @@ merged = merge_tags({"python", "java"}, {"python", "go"})
 info = get_user_info(1)
 parsed = parse_coordinates("1.5,2.3,4.8")
 top = get_top_words("the quick brown fox jumps over the lazy dog", 2)
+stream_freq = count_words_stream(["hello wo", "rld hel", "lo"])
+
+if __name__ == "__main__":
+    benchmark_word_count(int(os.environ.get("BENCH_SIZE_MB", "64")))
+    benchmark_parallel_word_count(int(os.environ.get("BENCH_SIZE_MB", "64")))
@@ -1,4 +1,16 @@
+from __future__ import annotations
+
+import functools
 import json
+import math
+import os
+import re
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import accumulate
+from timeit import timeit
+from typing import Iterable, Protocol
 
 
 def process_payment(amount_input: str) -> float | str:
@@ -12,6 +24,65 @@ def process_payment(amount_input: str) -> float | str:
     return amount + tax
 
 
+TAX_RATE = 0.1
+_MAX_CENTS = 2**63 - 1
+_CENTS_PATTERN = re.compile(r"\s*(\d+)(?:\.(\d{1,2}))?\s*")
+
+
+def process_payments(amount_inputs: Iterable[str]) -> tuple[array[float], bytearray]:
+    """
+    Add tax to a column of amounts.
+    Returns the taxed amounts and a mask with 1 for each invalid row (set to NaN).
+    """
+    amounts = array("d")
+    invalid = bytearray()
+    for amount_input in amount_inputs:
+        try:
+            amount = float(amount_input)
+        except ValueError:
+            amount = math.nan
+        amounts.append(amount)
+        invalid.append(not amount >= 0.0 or amount == math.inf)
+    for row in _positions(invalid):
+        amounts[row] = math.nan
+    return array("d", [amount + amount * TAX_RATE for amount in amounts]), invalid
+
+
+def process_payments_cents(
+    amount_inputs: Iterable[str],
+) -> tuple[array[int], bytearray]:
+    """
+    Add 10% tax exactly, in integer cents, rounding half cents up.
+    Amounts must look like "12" or "12.3" or "12.34", and their taxed total
+    must fit in 64 bits; other rows are invalid (0).
+    """
+    taxed = array("q")
+    invalid = bytearray()
+    match = _CENTS_PATTERN.fullmatch
+    for amount_input in amount_inputs:
+        parsed = match(amount_input)
+        if parsed is not None:
+            whole, fraction = parsed.groups()
+            cents = int(whole) * 100 + int((fraction or "0").ljust(2, "0"))
+            total = cents + (cents + 5) // 10
+            if total <= _MAX_CENTS:
+                taxed.append(total)
+                invalid.append(0)
+                continue
+        taxed.append(0)
+        invalid.append(1)
+    return taxed, invalid
+
+
+def _positions(mask: bytearray) -> list[int]:
+    positions: list[int] = []
+    position = mask.find(1)
+    while position != -1:
+        positions.append(position)
+        position = mask.find(1, position + 1)
+    return positions
+
+
 def track_order_status(order_id: str) -> dict[str, str]:
     # Check if order exists
     peding_status = "checking"
@@ -35,7 +106,7 @@ def calculate_discount(items: list[dict[str, str | int]]) -> float:
 
     for item in items:
         price = item["price"]
-        assert isinstance(price, bool)
+        assert isinstance(price, int)
         total = total + price
 
     # Free order?
@@ -47,22 +118,253 @@ def calculate_discount(items: list[dict[str, str | int]]) -> float:
     return total - discount
 
 
-def parse_config(config_str: str) -> str:
-    result = None
-    host: str = ""
+@dataclass(frozen=True)
+class OrderTracking:
+    order_id: str
+    state: str
+    tracking: str
+
+
+class OrderStore(Protocol):
+    def load(self, order_ids: list[str]) -> dict[str, OrderTracking]:
+        """Return tracking for the given orders. Unknown orders are left out."""
+        ...
+
+    def version(self) -> object:
+        """Return a token that changes whenever the stored orders change."""
+        ...
+
+
+class JsonFileOrderStore:
+    """
+    Local order store: a JSON file mapping order ID to state and tracking.
+    The file is parsed once and re-read only when its modification time or
+    size changes.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._cached: tuple[tuple[int, int], dict[str, OrderTracking]] | None = None
+
+    def version(self) -> tuple[int, int]:
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _orders(self) -> dict[str, OrderTracking]:
+        version = self.version()
+        cached = self._cached
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        with open(self.path, encoding="utf-8") as file:
+            data: dict[str, dict[str, str]] = json.load(file)
+        orders = {
+            order_id: OrderTracking(order_id, entry["state"], entry["tracking"])
+            for order_id, entry in data.items()
+        }
+        self._cached = (version, orders)
+        return orders
+
+    def load(self, order_ids: list[str]) -> dict[str, OrderTracking]:
+        orders = self._orders()
+        return {
+            order_id: orders[order_id] for order_id in order_ids if order_id in orders
+        }
+
+
+class OrderIndex:
+    """
+    In-memory order tracking index, filled from a backing store on misses.
+    Orders loaded from the store, and orders it did not have, are kept in an
+    LRU cache of up to max_entries. The cache is dropped whenever the store's
+    version() changes, so it never serves tracking the store has replaced.
+    Orders passed to add() take precedence and are never evicted.
+    """
+
+    def __init__(
+        self, store: OrderStore | None = None, max_entries: int = 100_000
+    ) -> None:
+        self.store = store
+        self.max_entries = max_entries
+        self._orders: dict[str, OrderTracking] = {}
+        self._loaded: OrderedDict[str, OrderTracking | None] = OrderedDict()
+        self._store_version: object = None
+
+    def add(self, tracking: OrderTracking) -> None:
+        self._orders[tracking.order_id] = tracking
+        self._loaded.pop(tracking.order_id, None)
+
+    def lookup(self, order_ids: Iterable[str]) -> dict[str, OrderTracking | None]:
+        """Look up many orders, loading all misses with one store call."""
+        order_ids = list(order_ids)
+        orders = self._orders
+        loaded = self._loaded
+        if self.store is not None:
+            version = self.store.version()
+            if version != self._store_version:
+                loaded.clear()
+                self._store_version = version
+        result: dict[str, OrderTracking | None] = {}
+        missing: list[str] = []
+        for order_id in order_ids:
+            tracking = orders.get(order_id)
+            if tracking is None:
+                if order_id in loaded:
+                    loaded.move_to_end(order_id)
+                    tracking = loaded[order_id]
+                else:
+                    missing.append(order_id)
+            result[order_id] = tracking
+        if missing and self.store is not None:
+            found = self.store.load(list(dict.fromkeys(missing)))
+            for order_id in missing:
+                result[order_id] = loaded[order_id] = found.get(order_id)
+            while len(loaded) > self.max_entries:
+                loaded.popitem(last=False)
+        return result
 
+
+def track_order_statuses(
+    order_ids: Iterable[str], index: OrderIndex
+) -> dict[str, OrderTracking | None]:
+    """Resolve tracking for many orders. Unknown orders map to None."""
+    return index.lookup(order_ids)
+
+
+def calculate_discounts(prices: array[int], offsets: array[int]) -> array[float]:
+    """
+    Calculate discounted totals for many carts from one column of prices.
+    Cart i's prices are at prices[offsets[i]:offsets[i + 1]].
+    """
+    totals = [sum(prices[start:end]) for start, end in zip(offsets, offsets[1:])]
+    return array("d", [total - total * 0.1 for total in totals])
+
+
+def carts_to_columns(carts: list[list[int]]) -> tuple[array[int], array[int]]:
+    """Flatten carts of prices into (prices, offsets) columns."""
+    prices = array("q")
+    for cart in carts:
+        prices.extend(cart)
+    offsets = array("q", accumulate((len(cart) for cart in carts), initial=0))
+    return prices, offsets
+
+
+class ConfigError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Config:
+    host: str
+    port: int = 80
+
+    @classmethod
+    def from_json(cls, config_str: str) -> "Config":
+        """Parse and validate a JSON config. Raises ConfigError if invalid."""
+        data = _config_object(config_str)
+        port = data.get("port", 80)
+        if not isinstance(port, int) or isinstance(port, bool):
+            raise ConfigError("port must be an integer")
+        return cls(host=_config_host(data), port=port)
+
+
+def _config_object(config_str: str) -> dict[str, object]:
     try:
-        result = json.loads(config_str)
-        host = result["host"]
-        assert isinstance(host, str)
-    except json.JSONDecodeError:
-        result = "Parse error"
+        data = json.loads(config_str)
+    except json.JSONDecodeError as error:
+        raise ConfigError(f"Parse error: {error}") from error
+    if not isinstance(data, dict):
+        raise ConfigError("Config must be a JSON object")
+    return data
+
 
+def _config_host(data: dict[str, object]) -> str:
+    host = data.get("host")
+    if not isinstance(host, str):
+        raise ConfigError("host must be a string")
     return host
 
 
+class ConfigLoader:
+    """
+    Loads configs once and serves them from an LRU cache.
+    Strings are cached by content, files by modification time and size.
+    """
+
+    def __init__(self, maxsize: int = 128) -> None:
+        self.maxsize = maxsize
+        self._by_content: OrderedDict[str, Config] = OrderedDict()
+        self._by_file: OrderedDict[str, tuple[int, int, Config]] = OrderedDict()
+
+    def load_string(self, config_str: str) -> Config:
+        cache = self._by_content
+        config = cache.get(config_str)
+        if config is not None:
+            cache.move_to_end(config_str)
+            return config
+        config = Config.from_json(config_str)
+        cache[config_str] = config
+        if len(cache) > self.maxsize:
+            cache.popitem(last=False)
+        return config
+
+    def load_file(self, path: str) -> Config:
+        """Load a config file, re-reading it only when it has changed on disk."""
+        stat = os.stat(path)
+        cache = self._by_file
+        cached = cache.get(path)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            cache.move_to_end(path)
+            return cached[2]
+        with open(path, encoding="utf-8") as file:
+            config = self.load_string(file.read())
+        cache[path] = (stat.st_mtime_ns, stat.st_size, config)
+        cache.move_to_end(path)
+        if len(cache) > self.maxsize:
+            cache.popitem(last=False)
+        return config
+
+
+@functools.lru_cache(maxsize=128)
+def parse_config(config_str: str) -> str:
+    """
+    Return the config's host, or "" if it is not valid JSON. Only host is
+    validated, so other fields may hold anything; results are LRU cached.
+    """
+    try:
+        return _config_host(_config_object(config_str))
+    except ConfigError as error:
+        if isinstance(error.__cause__, json.JSONDecodeError):
+            return ""
+        raise
+
+
+def benchmark_config_loading(repeat: int = 100_000) -> None:
+    """Compare json.loads, a cached load and a plain dict lookup."""
+    config_str = json.dumps({"host": "localhost", "port": 8080, "tags": list("abc")})
+    loader = ConfigLoader()
+    plain = {config_str: Config("localhost", 8080)}
+    timings = {
+        "json.loads": timeit(lambda: json.loads(config_str), number=repeat),
+        "cached load": timeit(lambda: loader.load_string(config_str), number=repeat),
+        "dict lookup": timeit(lambda: plain[config_str], number=repeat),
+    }
+    for name, seconds in timings.items():
+        print(f"{name}: {seconds / repeat * 1e9:.0f} ns/call")
+
+
 # Usage
 result = process_payment("100.50")
 order_result = track_order_status("ORD-123")
 discount_result = calculate_discount([{"price": 0}])
 config_result = parse_config("invalid{")
+taxed, taxed_invalid = process_payments(["100.50", "-1", "abc"])
+taxed_cents, taxed_cents_invalid = process_payments_cents(["100.50", "0.05", "1.234"])
+
+order_index = OrderIndex()
+order_index.add(OrderTracking("ORD-123", "shipped", "123ABC"))
+tracked = track_order_statuses(["ORD-123", "ORD-404"], order_index)
+cart_prices, cart_offsets = carts_to_columns([[0], [10, 20], [5]])
+discounts = calculate_discounts(cart_prices, cart_offsets)
+
+if __name__ == "__main__":
+    benchmark_config_loading()
@@ -1,9 +1,43 @@
-from typing import Literal
+from typing import IO, Iterable, Literal, TypeGuard
 
 OrderCompleted = Literal["delivered", "cancelled", "completed"]
 OrderPending = Literal["pending", "processing", "shipped"]
 OrderStatus = OrderCompleted | OrderPending
 
+ORDER_STATUSES: tuple[OrderStatus, ...] = (
+    "pending",
+    "processing",
+    "shipped",
+    "delivered",
+    "cancelled",
+    "completed",
+)
+NEXT_STATUS: dict[OrderStatus, OrderStatus] = {
+    "pending": "processing",
+    "processing": "shipped",
+    "shipped": "delivered",
+    "delivered": "completed",
+    "cancelled": "completed",
+    "completed": "completed",
+}
+CANCELLABLE_STATUSES: frozenset[OrderStatus] = frozenset({"pending", "processing"})
+
+# Small-int codes for bulk processing. INVALID_CODE marks unknown statuses.
+STATUS_CODES: dict[str, int] = {status: i for i, status in enumerate(ORDER_STATUSES)}
+INVALID_CODE = 255
+CANCELLABLE_CODES = frozenset(STATUS_CODES[s] for s in CANCELLABLE_STATUSES)
+# 256-entry translation table: code -> next code, anything unknown -> INVALID_CODE.
+_NEXT_CODE_TABLE = bytes(
+    STATUS_CODES[NEXT_STATUS[ORDER_STATUSES[code]]]
+    if code < len(ORDER_STATUSES)
+    else INVALID_CODE
+    for code in range(256)
+)
+
+
+def is_order_status(status: str) -> TypeGuard[OrderStatus]:
+    return status in STATUS_CODES
+
 
 def set_order_status(order_id: str, status: OrderStatus) -> None:
     print(f"Order {order_id} status: {status}")
@@ -11,30 +45,155 @@ def set_order_status(order_id: str, status: OrderStatus) -> None:
 
 def can_cancel_order(status: OrderStatus) -> bool:
     """Check if an order can be cancelled based on status."""
-    return status in ["pending", "processing"]
+    return status in CANCELLABLE_STATUSES
 
 
 def get_next_status(current: OrderStatus) -> OrderStatus:
     """Get the next valid status."""
-    if current == "pending":
-        return "processing"
-    elif current == "processing":
-        return "shipped"
-    elif current == "shipped":
-        return "delivered"
-    else:
-        return "completed"
+    return NEXT_STATUS[current]
 
 
 def handle_order(order_id: str, status: OrderStatus | str) -> None:
     """Handle an order based on its status."""
-    assert isinstance(status, OrderStatus)
+    if not is_order_status(status):
+        print(f"Order {order_id} has invalid status: {status}")
+        return
     set_order_status(order_id, status)
     if can_cancel_order(status):
         print("Order can be cancelled")
 
 
+def encode_statuses(statuses: Iterable[str]) -> bytes:
+    """Encode statuses as one code byte each. Unknown statuses get INVALID_CODE."""
+    return bytes(STATUS_CODES.get(status, INVALID_CODE) for status in statuses)
+
+
+def decode_statuses(codes: bytes) -> list[OrderStatus | None]:
+    """Decode status codes. Invalid codes decode to None."""
+    lookup: list[OrderStatus | None] = [*ORDER_STATUSES]
+    lookup += [None] * (256 - len(lookup))
+    return [lookup[code] for code in codes]
+
+
+def advance_orders(codes: bytes) -> tuple[bytes, list[int]]:
+    """
+    Move every order to its next status in one step.
+    Returns the new codes and the positions of invalid input codes.
+    """
+    advanced = codes.translate(_NEXT_CODE_TABLE)
+    invalid: list[int] = []
+    position = advanced.find(INVALID_CODE)
+    while position != -1:
+        invalid.append(position)
+        position = advanced.find(INVALID_CODE, position + 1)
+    return advanced, invalid
+
+
+class OrderStatusTracker:
+    """
+    Tracks the current status of each order, indexed by status.
+    Every change is appended to a tab-separated log that replay() reads back.
+    """
+
+    def __init__(self, log_path: str | None = None) -> None:
+        self._status: dict[str, OrderStatus] = {}
+        self._by_status: dict[OrderStatus, set[str]] = {
+            s: set() for s in ORDER_STATUSES
+        }
+        self._log: IO[str] | None = None
+        if log_path is not None:
+            self._log = open(log_path, "a", encoding="utf-8")
+
+    @classmethod
+    def replay(cls, log_path: str) -> "OrderStatusTracker":
+        """
+        Rebuild a tracker from its log and keep appending to it. A final line
+        without a newline is a write torn by a crash: it is dropped and cut
+        from the log. Invalid complete lines raise ValueError.
+        """
+        latest: dict[str, OrderStatus] = {}
+        with open(log_path, "rb") as log:
+            data = log.read()
+        lines = data.split(b"\n")
+        torn = lines.pop()
+        for raw in lines:
+            line = raw.decode("utf-8")
+            order_id, _, status = line.partition("\t")
+            if not is_order_status(status):
+                raise ValueError(f"Invalid status in log: {line!r}")
+            latest[order_id] = status
+        if torn:
+            with open(log_path, "r+b") as log:
+                log.truncate(len(data) - len(torn))
+        tracker = cls(log_path)
+        tracker._status = latest
+        for order_id, status in latest.items():
+            tracker._by_status[status].add(order_id)
+        return tracker
+
+    def close(self) -> None:
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def set_status(self, order_id: str, status: OrderStatus) -> None:
+        """
+        Record a new status for an order. Raises ValueError for an order ID
+        containing a tab or newline, which would corrupt the log.
+        """
+        if "\t" in order_id or "\n" in order_id:
+            raise ValueError(f"Order ID cannot contain a tab or newline: {order_id!r}")
+        previous = self._status.get(order_id)
+        if previous == status:
+            return
+        if previous is not None:
+            self._by_status[previous].discard(order_id)
+        self._status[order_id] = status
+        self._by_status[status].add(order_id)
+        if self._log is not None:
+            self._log.write(f"{order_id}\t{status}\n")
+            self._log.flush()
+
+    def advance(self, order_id: str) -> OrderStatus:
+        """Move an order to its next status and return it."""
+        status = get_next_status(self._status[order_id])
+        self.set_status(order_id, status)
+        return status
+
+    def cancel(self, order_id: str) -> None:
+        """Cancel an order. Raises ValueError if it is past cancellation."""
+        status = self._status[order_id]
+        if not can_cancel_order(status):
+            raise ValueError(f"Order {order_id} cannot be cancelled when {status}")
+        self.set_status(order_id, "cancelled")
+
+    def get_status(self, order_id: str) -> OrderStatus | None:
+        return self._status.get(order_id)
+
+    def orders_with_status(self, status: OrderStatus) -> set[str]:
+        return set(self._by_status[status])
+
+    def count(self, status: OrderStatus) -> int:
+        return len(self._by_status[status])
+
+    def cancellable_orders(self) -> set[str]:
+        """Return IDs of all orders that can still be cancelled."""
+        return set().union(*(self._by_status[s] for s in CANCELLABLE_STATUSES))
+
+
 # Usage
 handle_order("ORD-001", "pending")
 handle_order("ORD-002", "invalid_status")
 next_status = get_next_status("pending")
+
+batch_codes = encode_statuses(["pending", "shipped", "invalid_status"])
+advanced_codes, invalid_positions = advance_orders(batch_codes)
+advanced_statuses = decode_statuses(advanced_codes)
+
+tracker = OrderStatusTracker()
+tracker.set_status("ORD-001", "pending")
+tracker.set_status("ORD-002", "pending")
+tracker.advance("ORD-002")
+tracker.cancel("ORD-001")
+shipped_count = tracker.count("shipped")
+cancellable = tracker.cancellable_orders()
@@ -1,3 +1,10 @@
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from itertools import accumulate, chain, islice
+from operator import sub
+from time import perf_counter
 from typing import TypedDict
 
 
@@ -26,8 +33,8 @@ def create_order_item(name: str, qty: int, price: float) -> OrderItem:
 
 
 def calculate_item_total(item: OrderItem) -> float:
-    """Calculate total for an item."""
-    return item["quantity"] * item["price"]
+    """Calculate total for an item, after its fractional discount."""
+    return item["quantity"] * item["price"] * (1.0 - item["discount"])
 
 
 def create_order(order_id: str, customer: str) -> Order:
@@ -41,7 +48,249 @@ def add_item_to_order(order: Order, item: OrderItem) -> None:
     order["total"] += calculate_item_total(item)
 
 
+@dataclass
+class OrderColumns:
+    """
+    Orders flattened into columns.
+    Items of order i are at positions offsets[i]:offsets[i + 1].
+    """
+
+    order_ids: list[str]
+    offsets: array[int]
+    quantities: array[int]
+    prices: array[float]
+    discounts: array[float]
+
+
+def orders_to_columns(orders: list[Order]) -> OrderColumns:
+    """Flatten orders into columnar arrays."""
+    items = list(chain.from_iterable(order["items"] for order in orders))
+    return OrderColumns(
+        order_ids=[order["order_id"] for order in orders],
+        offsets=array("q", accumulate((len(o["items"]) for o in orders), initial=0)),
+        quantities=array("q", [item["quantity"] for item in items]),
+        prices=array("d", [item["price"] for item in items]),
+        discounts=array("d", [item["discount"] for item in items]),
+    )
+
+
+def price_columns(columns: OrderColumns) -> tuple[array[float], array[float]]:
+    """
+    Calculate every line total, then every order total with a segmented sum
+    that walks the line totals once, without copying a slice per order.
+    Returns (line_totals, order_totals).
+    """
+    line_totals = array(
+        "d",
+        [
+            q * p * (1.0 - d)
+            for q, p, d in zip(columns.quantities, columns.prices, columns.discounts)
+        ],
+    )
+    lines = iter(line_totals)
+    offsets = columns.offsets
+    order_totals = array(
+        "d", [sum(islice(lines, count)) for count in map(sub, offsets[1:], offsets)]
+    )
+    return line_totals, order_totals
+
+
+def reprice_orders(orders: list[Order]) -> None:
+    """
+    Recalculate and store the total of every order in one batch.
+    Flattening dict orders costs more than pricing them, so this is no faster
+    than a per-item loop; price_columns pays off when columns are reused.
+    """
+    _, order_totals = price_columns(orders_to_columns(orders))
+    for order, total in zip(orders, order_totals):
+        order["total"] = total
+
+
+def benchmark_repricing(order_count: int, items_per_order: int) -> None:
+    """Compare batch repricing with summing calculate_item_total per order."""
+    orders = [create_order(f"ORD-{i}", "Bench") for i in range(order_count)]
+    for order in orders:
+        order["items"] = [
+            {"product_name": f"P{j}", "quantity": j + 1, "price": 1.25, "discount": 0.1}
+            for j in range(items_per_order)
+        ]
+
+    start = perf_counter()
+    for order in orders:
+        order["total"] = sum(calculate_item_total(item) for item in order["items"])
+    loop_time = perf_counter() - start
+    expected = [order["total"] for order in orders]
+
+    start = perf_counter()
+    columns = orders_to_columns(orders)
+    flatten_time = perf_counter() - start
+    start = perf_counter()
+    _, order_totals = price_columns(columns)
+    batch_time = perf_counter() - start
+
+    assert all(abs(a - b) < 1e-6 for a, b in zip(order_totals, expected))
+    lines = order_count * items_per_order
+    print(
+        f"{lines} lines: loop {loop_time:.3f}s, "
+        f"flatten {flatten_time:.3f}s, batch {batch_time:.3f}s, "
+        f"flatten + batch {flatten_time + batch_time:.3f}s"
+    )
+
+
+class OrderEngine:
+    """
+    Keeps open orders indexed by product.
+    Order totals are updated incrementally instead of re-summed.
+    Removing a line moves the order's last line into its place.
+    """
+
+    def __init__(self) -> None:
+        self._orders: dict[str, Order] = {}
+        self._positions: dict[str, dict[str, int]] = {}
+        self._orders_by_product: dict[str, set[str]] = {}
+
+    def open_order(self, order: Order) -> None:
+        """
+        Start tracking an order and index any items it already has.
+        Lines for the same product are merged. Raises ValueError, leaving the
+        order untouched, if a line is invalid or conflicts with another.
+        """
+        order_id = order["order_id"]
+        if order_id in self._orders:
+            raise ValueError(f"Order {order_id} is already open")
+        items = list(order["items"])
+        terms: dict[str, tuple[float, float]] = {}
+        for item in items:
+            _check_item(item)
+            product_name = item["product_name"]
+            existing = terms.setdefault(product_name, (item["price"], item["discount"]))
+            if existing != (item["price"], item["discount"]):
+                raise ValueError(
+                    f"{product_name} appears in order {order_id} "
+                    "with different prices or discounts"
+                )
+        order["items"] = []
+        order["total"] = 0.0
+        self._orders[order_id] = order
+        self._positions[order_id] = {}
+        for item in items:
+            self.add_item(order_id, item)
+
+    def close_order(self, order_id: str) -> Order:
+        """Stop tracking an order and drop it from the product index."""
+        order = self._orders.pop(order_id)
+        for product_name in self._positions.pop(order_id):
+            self._unindex(product_name, order_id)
+        return order
+
+    def get_order(self, order_id: str) -> Order:
+        return self._orders[order_id]
+
+    def find_item(self, order_id: str, product_name: str) -> OrderItem | None:
+        """Find an item in an order by product. Returns None if not found."""
+        position = self._positions[order_id].get(product_name)
+        if position is None:
+            return None
+        return self._orders[order_id]["items"][position]
+
+    def orders_with_product(self, product_name: str) -> set[str]:
+        """Return IDs of open orders that contain the product."""
+        return set(self._orders_by_product.get(product_name, ()))
+
+    def add_item(self, order_id: str, item: OrderItem) -> None:
+        """
+        Add an item, merging quantity into an existing line for the product.
+        Raises ValueError if the item is invalid or the existing line has a
+        different price or discount.
+        """
+        _check_item(item)
+        order = self._orders[order_id]
+        positions = self._positions[order_id]
+        product_name = item["product_name"]
+        position = positions.get(product_name)
+        if position is not None:
+            existing = order["items"][position]
+            if (existing["price"], existing["discount"]) != (
+                item["price"],
+                item["discount"],
+            ):
+                raise ValueError(
+                    f"{product_name} is already in order {order_id} "
+                    f"at ${existing['price']} with discount {existing['discount']}"
+                )
+            self.set_quantity(
+                order_id, product_name, existing["quantity"] + item["quantity"]
+            )
+            return
+        positions[product_name] = len(order["items"])
+        order["items"].append(item)
+        order["total"] += calculate_item_total(item)
+        self._orders_by_product.setdefault(product_name, set()).add(order_id)
+
+    def remove_item(self, order_id: str, product_name: str) -> OrderItem:
+        """Remove the line for a product from an order."""
+        order = self._orders[order_id]
+        positions = self._positions[order_id]
+        items = order["items"]
+        position = positions.pop(product_name)
+        item = items[position]
+        last = items.pop()
+        if last is not item:
+            items[position] = last
+            positions[last["product_name"]] = position
+        order["total"] -= calculate_item_total(item)
+        self._unindex(product_name, order_id)
+        return item
+
+    def set_quantity(self, order_id: str, product_name: str, quantity: int) -> None:
+        """Change the quantity of a line. A quantity of 0 removes it."""
+        if quantity < 0:
+            raise ValueError("Quantity cannot be negative")
+        if quantity == 0:
+            self.remove_item(order_id, product_name)
+            return
+        order = self._orders[order_id]
+        item = order["items"][self._positions[order_id][product_name]]
+        order["total"] -= calculate_item_total(item)
+        item["quantity"] = quantity
+        order["total"] += calculate_item_total(item)
+
+    def set_discount(self, order_id: str, product_name: str, discount: float) -> None:
+        """Change the fractional discount of a line."""
+        if not 0.0 <= discount <= 1.0:
+            raise ValueError("Discount must be between 0 and 1")
+        order = self._orders[order_id]
+        item = order["items"][self._positions[order_id][product_name]]
+        order["total"] -= calculate_item_total(item)
+        item["discount"] = discount
+        order["total"] += calculate_item_total(item)
+
+    def _unindex(self, product_name: str, order_id: str) -> None:
+        order_ids = self._orders_by_product[product_name]
+        order_ids.discard(order_id)
+        if not order_ids:
+            del self._orders_by_product[product_name]
+
+
+def _check_item(item: OrderItem) -> None:
+    if item["quantity"] <= 0:
+        raise ValueError("Quantity must be positive")
+    if not 0.0 <= item["discount"] <= 1.0:
+        raise ValueError("Discount must be between 0 and 1")
+
+
 # Usage
 item = create_order_item("Widget", 2, 19.99)
 order = create_order("ORD-001", "Alice")
 add_item_to_order(order, item)
+
+engine = OrderEngine()
+engine.open_order(order)
+engine.add_item("ORD-001", create_order_item("Gadget", 1, 5.00))
+engine.set_quantity("ORD-001", "Widget", 3)
+engine.set_discount("ORD-001", "Gadget", 0.5)
+widget_orders = engine.orders_with_product("Widget")
+reprice_orders([order])
+
+if __name__ == "__main__":
+    benchmark_repricing(100_000, 10)
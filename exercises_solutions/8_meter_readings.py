@@ -1,8 +1,15 @@
+import os
+import re
+import sys
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import Iterable, Iterator
+from functools import partial
+from time import perf_counter
+from typing import Callable, Iterable, Iterator, Mapping
 
 
-@dataclass
+@dataclass(frozen=True)
 class MeterReading:
     meter_id: str
     kwh: float
@@ -34,6 +41,70 @@ def get_meter_ids(readings: Iterable[MeterReading]) -> list[str]:
     return ids
 
 
+class MeterRegistry:
+    """
+    Distinct meter IDs with reading counts, indexed by prefix and by type.
+    A meter's type is the letters its ID starts with, e.g. "ELEC" for "ELEC001".
+    """
+
+    _TYPE = re.compile(r"[A-Za-z]*")
+
+    def __init__(self) -> None:
+        self.counts: dict[str, int] = {}
+        self._by_type: dict[str, list[str]] = {}
+        self._sorted: list[str] = []
+        self._unsorted: list[str] = []
+
+    def add(self, meter_id: str) -> None:
+        counts = self.counts
+        if meter_id in counts:
+            counts[meter_id] += 1
+            return
+        meter_id = sys.intern(meter_id)
+        counts[meter_id] = 1
+        self._unsorted.append(meter_id)
+        meter_type = self._TYPE.match(meter_id)
+        assert meter_type is not None
+        self._by_type.setdefault(meter_type.group(), []).append(meter_id)
+
+    def add_readings(self, readings: Iterable[MeterReading]) -> None:
+        for reading in readings:
+            self.add(reading.meter_id)
+
+    def with_prefix(self, prefix: str) -> list[str]:
+        """All distinct meter IDs starting with prefix, sorted."""
+        ids = self._sorted_ids()
+        start = bisect_left(ids, prefix)
+        end = start
+        while end < len(ids) and ids[end].startswith(prefix):
+            end += 1
+        return ids[start:end]
+
+    def of_type(self, meter_type: str) -> list[str]:
+        """Distinct meter IDs of a type, in the order first seen."""
+        return list(self._by_type.get(meter_type, ()))
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def _sorted_ids(self) -> list[str]:
+        # New IDs are sorted in on the next query, not on every add.
+        if self._unsorted:
+            self._sorted.extend(self._unsorted)
+            self._sorted.sort()
+            self._unsorted.clear()
+        return self._sorted
+
+
+def get_distinct_meter_ids(
+    readings: Iterable[MeterReading], prefix: str = "ELEC"
+) -> list[str]:
+    """Distinct meter IDs with the prefix, sorted, without duplicates per reading."""
+    registry = MeterRegistry()
+    registry.add_readings(readings)
+    return registry.with_prefix(prefix)
+
+
 def reading_generator(meter_id: str, days: int) -> Iterator[MeterReading]:
     """
     Generate daily readings for a meter.
@@ -87,6 +158,112 @@ def average_consumption(readings: Iterable[MeterReading]) -> float:
     return total / count if count > 0 else 0.0
 
 
+@dataclass(frozen=True)
+class ConsumptionSummary:
+    total: float
+    average: float
+    count: int
+
+
+def summarize_consumption(readings: Iterable[MeterReading]) -> ConsumptionSummary:
+    """Total and average consumption in a single pass over readings."""
+    total = 0.0
+    count = 0
+    for reading in readings:
+        total += reading.kwh
+        count += 1
+    return ConsumptionSummary(total, total / count if count > 0 else 0.0, count)
+
+
+ReadingSource = Callable[[], Iterable[MeterReading]]
+
+
+def _summarize_chunk(
+    chunk: list[tuple[str, ReadingSource]],
+) -> list[tuple[str, ConsumptionSummary]]:
+    return [(meter_id, summarize_consumption(source())) for meter_id, source in chunk]
+
+
+def summarize_meters(
+    sources: Mapping[str, ReadingSource],
+    workers: int | None = None,
+    chunk_size: int = 256,
+) -> dict[str, ConsumptionSummary]:
+    """
+    Total and average consumption for every meter, computed in a process pool.
+    Each source is called inside a worker, so it must be picklable, e.g.
+    partial(reading_generator, meter_id, days). Readings are streamed, so a
+    worker only holds one chunk of summaries at a time.
+    """
+    items = list(sources.items())
+    chunks = [items[i : i + chunk_size] for i in range(0, len(items), chunk_size)]
+    results: dict[str, ConsumptionSummary] = {}
+    with ProcessPoolExecutor(workers) as pool:
+        for chunk_results in pool.map(_summarize_chunk, chunks):
+            results.update(chunk_results)
+    return results
+
+
+def benchmark_summarize_meters(meters: int = 20_000, days: int = 365) -> None:
+    """Report summarize_meters speedup from 1 to cpu_count workers."""
+    sources: dict[str, ReadingSource] = {
+        f"ELEC{i:06d}": partial(reading_generator, f"ELEC{i:06d}", days)
+        for i in range(meters)
+    }
+    start = perf_counter()
+    serial = {meter_id: summarize_consumption(s()) for meter_id, s in sources.items()}
+    serial_time = perf_counter() - start
+    print(f"{meters} meters x {days} readings, serial: {serial_time:.2f}s")
+
+    workers = 1
+    max_workers = os.cpu_count() or 1
+    while True:
+        start = perf_counter()
+        parallel = summarize_meters(sources, workers)
+        elapsed = perf_counter() - start
+        assert parallel == serial
+        print(f"{workers} workers: {elapsed:.2f}s, {serial_time / elapsed:.2f}x")
+        if workers >= max_workers:
+            break
+        workers = min(workers * 2, max_workers)
+
+
+def benchmark_meter_registry(readings: int = 2_000_000, meters: int = 100_000) -> None:
+    """Time registry ingest and prefix queries against get_meter_ids."""
+    kinds = ("ELEC", "GAS", "WATER")
+    meter_ids = [f"{kinds[i % 3]}{i:06d}" for i in range(meters)]
+    data = [
+        MeterReading(meter_ids[(i * 7919) % meters], 1.0, "2024-01-01")
+        for i in range(readings)
+    ]
+    registry = MeterRegistry()
+    start = perf_counter()
+    registry.add_readings(data)
+    ingest = perf_counter() - start
+
+    start = perf_counter()
+    electric = registry.with_prefix("ELEC")
+    first_query = perf_counter() - start
+    start = perf_counter()
+    registry.with_prefix("ELEC")
+    repeat_query = perf_counter() - start
+    start = perf_counter()
+    narrow = registry.with_prefix("ELEC0001")
+    narrow_query = perf_counter() - start
+    start = perf_counter()
+    scanned = get_meter_ids(data)
+    scan = perf_counter() - start
+
+    assert set(scanned) == set(electric)
+    print(f"registry ingest: {readings / ingest:,.0f} readings/s")
+    print(
+        f"with_prefix ELEC: {first_query * 1000:.1f}ms first (includes sort), "
+        f"{repeat_query * 1000:.1f}ms after ({len(electric)} meters)"
+    )
+    print(f"with_prefix ELEC0001: {narrow_query * 1e6:.0f}us ({len(narrow)} meters)")
+    print(f"get_meter_ids scan: {scan * 1000:.1f}ms ({len(scanned)} ids)")
+
+
 # Usage
 readings = {
     MeterReading("ELEC001", 45.5, "2024-01-01"),
@@ -108,3 +285,11 @@ for batch in batches:
 reading_tuple = tuple(readings)
 avg = average_consumption(reading_tuple)
 count = count_readings(reading_tuple)
+
+registry = MeterRegistry()
+registry.add_readings(readings)
+electric_meters = registry.with_prefix("ELEC")
+
+if __name__ == "__main__":
+    benchmark_meter_registry()
+    benchmark_summarize_meters()